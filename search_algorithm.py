@@ -1,154 +1,286 @@
 # search_algorithm.py
-from collections import defaultdict
-from typing import List, Dict, Tuple
-import heapq
-from rapidfuzz import fuzz, process
-from spellchecker import SpellChecker
+from functools import lru_cache
+from typing import List, Dict, Optional, Tuple
+from rapidfuzz import fuzz, process, utils
+from rapidfuzz.distance import DamerauLevenshtein, Indel
 import random
+import re
 import numpy as np
 
-class MicroLanguageModel:
-    """Tiny neural language model for command decision making"""
-    def __init__(self, vocab_size=1000, embed_size=16):
-        # Tiny embedding layer
-        self.embeddings = np.random.randn(vocab_size, embed_size) * 0.01
-        # Tiny attention weights
-        self.attention_weights = np.random.randn(embed_size) * 0.01
-        # Tiny classifier
-        self.classifier = np.random.randn(embed_size, 3) * 0.01  # 3 features
+_WORD_RE = re.compile(r"[a-z0-9]{3,}")
+
+@lru_cache(maxsize=4096)
+def _tokenize(text: str) -> Tuple[str, ...]:
+    if not text:
+        return ()
+    # Unique words of 3+ alphanumeric characters, in order of appearance
+    return tuple(dict.fromkeys(_WORD_RE.findall(text.lower())))
+
+def _command_text(cmd: Dict) -> str:
+    return f"{cmd.get('intent','')} {cmd.get('command','')} {cmd.get('description','')}"
+
+class BKTree:
+    """Burkhard-Keller tree over the vocabulary for edit-distance lookups"""
+    def __init__(self, words=()):
+        self.root = None  # [word, {distance: child_node}]
+        for word in words:
+            self.insert(word)
     
-    def forward(self, word_indices):
-        """Simple forward pass with attention"""
-        if not word_indices:
-            return [0.33, 0.33, 0.33]  # Neutral probabilities
-        
-        # Get embeddings
-        embedded = np.mean([self.embeddings[idx % len(self.embeddings)] for idx in word_indices], axis=0)
+    def insert(self, word: str) -> None:
+        if self.root is None:
+            self.root = [word, {}]
+            return
         
-        # Tiny attention
-        attention_scores = np.dot(embedded, self.attention_weights)
-        attention_weights = np.exp(attention_scores) / np.sum(np.exp(attention_scores))
+        node = self.root
+        while True:
+            dist = DamerauLevenshtein.distance(word, node[0])
+            if dist == 0:
+                return  # Already present
+            child = node[1].get(dist)
+            if child is None:
+                node[1][dist] = [word, {}]
+                return
+            node = child
+    
+    def find(self, word: str, max_dist: int = 2) -> List[Tuple[int, str]]:
+        """Return (distance, word) pairs within max_dist, closest first"""
+        if self.root is None:
+            return []
         
-        # Weighted features
-        features = np.dot(embedded * attention_weights, self.classifier)
-        return 1 / (1 + np.exp(-features))  # Sigmoid
+        matches = []
+        stack = [self.root]
+        while stack:
+            node_word, children = stack.pop()
+            dist = DamerauLevenshtein.distance(word, node_word)
+            if dist <= max_dist:
+                matches.append((dist, node_word))
+            # Triangle inequality: only subtrees in [dist-max, dist+max] can match
+            for child_dist, child in children.items():
+                if dist - max_dist <= child_dist <= dist + max_dist:
+                    stack.append(child)
+        return sorted(matches)
+
+# Score weights, precision threshold and result count used by CommandSearcher.search
+_TEXT_WEIGHT = 0.6
+_COVERAGE_WEIGHT = 0.3
+_DENSITY_WEIGHT = 0.1
+# Tuned for token_set_ratio text scores; the old 0.3 assumed the LM's constant ~0.3 term
+_SCORE_THRESHOLD = 0.25
+_TOP_K = 3
+
+def _range_offsets(starts, lengths):
+    """Flat indices covering [starts[i], starts[i] + lengths[i]) for every i, in order"""
+    return np.arange(lengths.sum()) + np.repeat(starts - (np.cumsum(lengths) - lengths), lengths)
+
+def _score_and_topk(candidates, cmd_indptr, cmd_data, cmd_lens, query_ids, query_len, text_scores):
+    """Score candidate commands and return the best (indices, scores), best first"""
+    # Count query words in the candidates' CSR rows only; every candidate row is
+    # non-empty (it is on a posting list), so reduceat sees strictly increasing starts
+    lens = cmd_lens[candidates]
+    hits = np.isin(cmd_data[_range_offsets(cmd_indptr[candidates], lens)], query_ids)
+    matched = np.add.reduceat(hits, np.cumsum(lens) - lens, dtype=np.int32)
+    
+    # Weighted average of the text similarity, coverage (matched / query_len) and
+    # density (matched / command length) with the two match terms folded together
+    scores = _TEXT_WEIGHT * text_scores + matched * (
+        _COVERAGE_WEIGHT / query_len + _DENSITY_WEIGHT / lens)
+    
+    # Keep candidates above the precision threshold, then the top k of those
+    passed = np.flatnonzero(scores > _SCORE_THRESHOLD)
+    if len(passed) > _TOP_K:
+        passed = passed[np.argpartition(-scores[passed], _TOP_K - 1)[:_TOP_K]]
+    top = passed[np.argsort(-scores[passed])]
+    return candidates[top], scores[top]
 
 class CommandSearcher:
     def __init__(self):
-        self.word_index = defaultdict(set)
+        self.commands = []
+        self.active = np.zeros(0, dtype=bool)  # False marks a deleted command
         self.command_keywords = []
-        self.spell_checker = SpellChecker()
         self.all_words = []
         self.word_to_idx = {}
-        self.lm = None
+        self.bk_tree = BKTree()
+        # Corrections only depend on the live vocabulary; cleared whenever it changes
+        self._correct_word = lru_cache(maxsize=4096)(self._lookup_correction)
+        self.cmd_text = []  # Normalized search text of every command
+        # Sorted word ids of every command in CSR form
+        self.cmd_indptr = np.zeros(1, dtype=np.int32)
+        self.cmd_data = np.zeros(0, dtype=np.int32)
+        self.cmd_lens = np.zeros(0, dtype=np.int32)
+        # Inverted index in CSR form: commands containing word w are
+        # postings_data[postings_indptr[w]:postings_indptr[w + 1]]
+        self.postings_indptr = np.zeros(1, dtype=np.int32)
+        self.postings_data = np.zeros(0, dtype=np.int32)
+        # Number of non-deleted commands containing each word
+        self.word_live_counts = np.zeros(0, dtype=np.int32)
         
     def build_index(self, commands: List[Dict]) -> None:
-        self.word_index = defaultdict(set)
+        self.commands = list(commands)
+        self.active = np.ones(len(commands), dtype=bool)
         self.command_keywords = []
+        self.cmd_text = [utils.default_process(_command_text(cmd)) for cmd in commands]
         self.all_words = []
         self.word_to_idx = {}
         
         # Build vocabulary
         vocab = set()
         for cmd in commands:
-            search_text = f"{cmd.get('intent','')} {cmd.get('command','')} {cmd.get('description','')}"
-            vocab.update(self._tokenize(search_text))
+            vocab.update(_tokenize(_command_text(cmd)))
         
         self.all_words = list(vocab)
         self.word_to_idx = {word: idx for idx, word in enumerate(self.all_words)}
-        self.spell_checker.word_frequency.load_words(self.all_words)
-        
-        # Initialize tiny language model
-        self.lm = MicroLanguageModel(vocab_size=len(self.all_words))
+        self.bk_tree = BKTree(self.all_words)
+        self._correct_word.cache_clear()
         
         # Build command index
-        for idx, cmd in enumerate(commands):
-            search_text = f"{cmd.get('intent','')} {cmd.get('command','')} {cmd.get('description','')}"
-            words = self._tokenize(search_text)
-            
-            for word in words:
-                self.word_index[word].add(idx)
-            
-            self.command_keywords.append(set(words))
-    
-    def _tokenize(self, text: str) -> List[str]:
-        if not text:
-            return []
-        return list(set(word.strip('.,!?()[]{}').lower() 
-                     for word in text.split() 
-                     if len(word.strip('.,!?()[]{}')) > 2))
+        for cmd in commands:
+            words = _tokenize(_command_text(cmd))
+            self.command_keywords.append(
+                np.array(sorted(self.word_to_idx[word] for word in words), dtype=np.int32))
+        
+        self.cmd_lens = np.array([len(ids) for ids in self.command_keywords], dtype=np.int32)
+        self.cmd_indptr = np.concatenate(([0], np.cumsum(self.cmd_lens))).astype(np.int32)
+        self.cmd_data = np.concatenate([np.zeros(0, dtype=np.int32)] + self.command_keywords)
+        
+        # A stable sort by word id keeps each posting list in command order
+        cmd_of_word = np.repeat(np.arange(len(commands), dtype=np.int32), self.cmd_lens)
+        self.postings_data = cmd_of_word[np.argsort(self.cmd_data, kind='stable')]
+        word_counts = np.bincount(self.cmd_data, minlength=len(self.all_words))
+        self.postings_indptr = np.concatenate(([0], np.cumsum(word_counts))).astype(np.int32)
+        self.word_live_counts = word_counts.astype(np.int32)
     
-    def _correct_spelling(self, word: str) -> str:
-        if word in self.word_to_idx:
-            return word
+    def add_command(self, cmd: Dict) -> None:
+        """Index one new command without rebuilding the existing index"""
+        words = _tokenize(_command_text(cmd))
+        new_words = [word for word in words if word not in self.word_to_idx]
+        for word in new_words:
+            self.word_to_idx[word] = len(self.all_words)
+            self.all_words.append(word)
+            self.bk_tree.insert(word)
         
-        correction = self.spell_checker.correction(word)
-        if correction and correction in self.word_to_idx:
-            return correction
+        idx = len(self.commands)
+        word_ids = np.array(sorted(self.word_to_idx[word] for word in words), dtype=np.int32)
+        self.word_live_counts = np.concatenate((
+            self.word_live_counts, np.zeros(len(new_words), dtype=np.int32)))
+        if np.any(self.word_live_counts[word_ids] == 0):
+            # New or revived words can change cached corrections
+            self._correct_word.cache_clear()
+        self.word_live_counts[word_ids] += 1
+        self.commands.append(cmd)
+        self.active = np.append(self.active, True)
+        self.command_keywords.append(word_ids)
+        self.cmd_text.append(utils.default_process(_command_text(cmd)))
         
-        best_match, score, _ = process.extractOne(word, self.all_words, scorer=fuzz.WRatio)
-        return best_match if score > 80 else word
+        self.cmd_lens = np.append(self.cmd_lens, np.int32(len(word_ids)))
+        self.cmd_data = np.concatenate((self.cmd_data, word_ids))
+        self.cmd_indptr = np.append(self.cmd_indptr, np.int32(len(self.cmd_data)))
+        
+        # New words start with empty posting lists; the new command has the
+        # highest index, so it goes at the end of each of its words' lists
+        indptr = np.concatenate((
+            self.postings_indptr, np.full(len(new_words), self.postings_indptr[-1], dtype=np.int32)))
+        self.postings_data = np.insert(self.postings_data, indptr[word_ids + 1], idx)
+        shift = np.zeros(len(indptr), dtype=np.int32)
+        shift[word_ids + 1] = 1
+        self.postings_indptr = indptr + np.cumsum(shift, dtype=np.int32)
     
-    def _get_word_indices(self, words: List[str]) -> List[int]:
-        """Convert words to indices for language model"""
-        return [self.word_to_idx[word] for word in words if word in self.word_to_idx]
+    def delete_command(self, command_id: int) -> bool:
+        """Mark the command with the given id as deleted so searches skip it"""
+        for idx, cmd in enumerate(self.commands):
+            if cmd.get('id') == command_id and self.active[idx]:
+                self.active[idx] = False
+                word_ids = self.command_keywords[idx]
+                self.word_live_counts[word_ids] -= 1
+                if np.any(self.word_live_counts[word_ids] == 0):
+                    # Words left only in deleted commands must stop being corrections
+                    self._correct_word.cache_clear()
+                return True
+        return False
     
-    def _analyze_with_lm(self, query_words: List[str], cmd_words: set) -> float:
-        """Use language model to analyze relevance"""
-        # Get word indices for language model
-        query_indices = self._get_word_indices(query_words)
-        cmd_indices = self._get_word_indices(list(cmd_words))
-        
-        # Get features from language model
-        query_features = self.lm.forward(query_indices)
-        cmd_features = self.lm.forward(cmd_indices)
+    def _is_live_word(self, word: str) -> bool:
+        """Whether word appears in at least one non-deleted command"""
+        idx = self.word_to_idx.get(word)
+        return idx is not None and self.word_live_counts[idx] > 0
+    
+    def _lookup_correction(self, word: str) -> Optional[str]:
+        """Closest live vocabulary word within a length-dependent edit distance, if any"""
+        # Two edits rewrite most of a short word, so words of up to 4 letters get one
+        max_dist = 1 if len(word) <= 4 else 2
+        # Hits must also clear the same WRatio > 80 bar as the fuzzy fallback, which
+        # leaves correctly spelled words that are not in the vocabulary alone.
+        # Ties on edit distance go to insertions/deletions over substitutions
+        # (lower Indel distance), then to words used by more live commands
+        ranked = [
+            (dist, Indel.distance(word, match), -self.word_live_counts[self.word_to_idx[match]], match)
+            for dist, match in self.bk_tree.find(word, max_dist=max_dist)
+            if self._is_live_word(match) and fuzz.WRatio(word, match, score_cutoff=80) > 80
+        ]
+        return min(ranked)[-1] if ranked else None
+    
+    def _correct_spelling(self, words: List[str]) -> List[str]:
+        corrected = list(words)
+        unknown = []
+        for pos, word in enumerate(words):
+            if self._is_live_word(word):
+                continue
+            correction = self._correct_word(word)
+            if correction:
+                corrected[pos] = correction
+            else:
+                unknown.append(pos)
         
-        # Simple cosine similarity
-        similarity = np.dot(query_features, cmd_features) / (
-            np.linalg.norm(query_features) * np.linalg.norm(cmd_features) + 1e-6)
+        if not unknown or not self.all_words:
+            return corrected
         
-        return (similarity + 1) / 2  # Normalize to 0-1 range
+        # Fall back to scoring the remaining words against the whole vocabulary
+        scores = process.cdist([words[pos] for pos in unknown], self.all_words,
+                               scorer=fuzz.WRatio, score_cutoff=80,
+                               dtype=np.uint8, workers=-1)
+        scores[:, self.word_live_counts == 0] = 0  # Never correct to deleted-only words
+        best_idx = scores.argmax(axis=1)
+        best_scores = scores.max(axis=1)
+        for pos, idx, score in zip(unknown, best_idx, best_scores):
+            if score > 80:
+                corrected[pos] = self.all_words[idx]
+        return corrected
     
-    def search(self, query: str, commands: List[Dict]) -> List[Tuple[Dict, float]]:
+    def search(self, query: str) -> List[Tuple[Dict, float]]:
         if not query.strip():
             return []
         
         # Process query
-        query_words = []
-        for word in self._tokenize(query):
-            corrected = self._correct_spelling(word)
-            if corrected:
-                query_words.append(corrected)
+        query_words = [word for word in self._correct_spelling(_tokenize(query)) if word]
         
         if not query_words:
             return []
         
-        # Find candidates
-        candidate_indices = set()
-        for word in query_words:
-            candidate_indices.update(self.word_index.get(word, set()))
+        # Sorted, de-duplicated vocabulary ids of the query
+        query_ids = np.array(sorted({self.word_to_idx[word] for word in query_words
+                                     if word in self.word_to_idx}), dtype=np.int32)
+        
+        if not len(query_ids):
+            return []
+        
+        # Find candidates: gather every query word's posting list in one fancy index
+        starts = self.postings_indptr[query_ids]
+        lengths = self.postings_indptr[query_ids + 1] - starts
+        candidate_indices = np.unique(self.postings_data[_range_offsets(starts, lengths)])
+        candidate_indices = candidate_indices[self.active[candidate_indices]]
+        
+        if not len(candidate_indices):
+            return []
+        
+        # Token-set similarity of the spelling-corrected query against each candidate's text
+        text_scores = process.cdist([utils.default_process(" ".join(query_words))],
+                                    [self.cmd_text[idx] for idx in candidate_indices.tolist()],
+                                    scorer=fuzz.token_set_ratio, dtype=np.uint8)[0]
+        text_scores = text_scores / 100  # Normalize to 0-1 range
         
         # Score candidates
-        scored_results = []
-        for idx in candidate_indices:
-            cmd_words = self.command_keywords[idx]
-            matched_words = set(query_words) & cmd_words
-            
-            # Language model analysis
-            lm_score = self._analyze_with_lm(query_words, cmd_words)
-            
-            # Traditional features
-            coverage = len(matched_words) / len(query_words)
-            density = len(matched_words) / len(cmd_words) if cmd_words else 0
-            
-            # Combined score (weighted average)
-            score = (lm_score * 0.6) + (coverage * 0.3) + (density * 0.1)
-            
-            if score > 0.3:  # Higher threshold for precision
-                heapq.heappush(scored_results, (-score, idx))
+        top_indices, top_scores = _score_and_topk(
+            candidate_indices, self.cmd_indptr, self.cmd_data, self.cmd_lens,
+            query_ids, len(query_words), text_scores)
         
         # Return top results
-        return [
-            (commands[idx], -score)
-            for score, idx in sorted(scored_results, key=lambda x: x[0])[:3]
-        ]
+        return [(self.commands[idx], score)
+                for idx, score in zip(top_indices.tolist(), top_scores.tolist())]
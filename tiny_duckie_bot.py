@@ -4,7 +4,6 @@ from typing import List, Dict
 from search_algorithm import CommandSearcher
 from colorama import init, Fore, Back, Style
 import sys
-import time
 import os
 import textwrap
 
@@ -14,82 +13,90 @@ class TinyDuckieBot:
     def __init__(self, db_file: str = "hacker_commands.db"):
         self.db_file = db_file
         self.searcher = CommandSearcher()
+        self._conn = self._connect()
         self._initialize_db()
         self._load_commands()
     
+    def _connect(self) -> sqlite3.Connection:
+        """Open the connection shared by every database operation"""
+        conn = sqlite3.connect(self.db_file, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        return conn
+    
+    def close(self):
+        """Close the database connection"""
+        self._conn.close()
+    
     def _initialize_db(self):
         """Initialize the SQLite database with commands table"""
-        with sqlite3.connect(self.db_file) as conn:
-            cursor = conn.cursor()
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS commands (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    intent TEXT NOT NULL,
-                    command TEXT NOT NULL UNIQUE,
-                    description TEXT DEFAULT ''
-                )
-            """)
-            conn.commit()
-            
-            # Add default commands if table is empty
-            if cursor.execute("SELECT COUNT(*) FROM commands").fetchone()[0] == 0:
-                default_commands = [
-                    ("ssh connect with private key", "ssh username@host -i id_rsa", "Connect SSH using private key authentication"),
-                    ("simple ssh command", "ssh username@host", "Basic SSH connection command"),
-                    ("scan network ports", "nmap -sV -T4 192.168.1.0/24", "Scan network for open ports and services")
-                ]
-                cursor.executemany(
-                    "INSERT INTO commands (intent, command, description) VALUES (?, ?, ?)",
-                    default_commands
-                )
-                conn.commit()
+        cursor = self._conn.cursor()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS commands (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                intent TEXT NOT NULL,
+                command TEXT NOT NULL UNIQUE,
+                description TEXT DEFAULT ''
+            )
+        """)
+        self._conn.commit()
+        
+        # Add default commands if table is empty
+        if cursor.execute("SELECT COUNT(*) FROM commands").fetchone()[0] == 0:
+            default_commands = [
+                ("ssh connect with private key", "ssh username@host -i id_rsa", "Connect SSH using private key authentication"),
+                ("simple ssh command", "ssh username@host", "Basic SSH connection command"),
+                ("scan network ports", "nmap -sV -T4 192.168.1.0/24", "Scan network for open ports and services")
+            ]
+            cursor.executemany(
+                "INSERT INTO commands (intent, command, description) VALUES (?, ?, ?)",
+                default_commands
+            )
+            self._conn.commit()
     
     def _load_commands(self):
         """Load commands from database into the searcher"""
-        with sqlite3.connect(self.db_file) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM commands")
-            commands = [dict(row) for row in cursor.fetchall()]
-            self.searcher.build_index(commands)
+        cursor = self._conn.execute("SELECT * FROM commands")
+        commands = [dict(row) for row in cursor.fetchall()]
+        self.searcher.build_index(commands)
     
     def search(self, query: str) -> list:
-        """Search commands in the database"""
-        with sqlite3.connect(self.db_file) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute("SELECT * FROM commands")
-            all_commands = [dict(row) for row in cursor.fetchall()]
-            return self.searcher.search(query, all_commands)
+        """Search the commands indexed from the database"""
+        return self.searcher.search(query)
     
     def add_command(self, intent: str, command: str, description: str = "") -> bool:
         """Add a new command to the database"""
         try:
-            with sqlite3.connect(self.db_file) as conn:
-                cursor = conn.cursor()
-                cursor.execute(
-                    "INSERT INTO commands (intent, command, description) VALUES (?, ?, ?)",
-                    (intent, command, description)
-                )
-                conn.commit()
-            self._load_commands()  # Rebuild index
-            return True
+            cursor = self._conn.execute(
+                "INSERT INTO commands (intent, command, description) VALUES (?, ?, ?)",
+                (intent, command, description)
+            )
+            self._conn.commit()
         except sqlite3.IntegrityError:  # Duplicate command
+            self._conn.rollback()
             return False
+        self.searcher.add_command({
+            'id': cursor.lastrowid,
+            'intent': intent,
+            'command': command,
+            'description': description
+        })
+        return True
     
     def delete_command(self, command_id: int) -> bool:
         """Delete a command from the database by ID"""
         try:
-            with sqlite3.connect(self.db_file) as conn:
-                cursor = conn.cursor()
-                cursor.execute("DELETE FROM commands WHERE id = ?", (command_id,))
-                conn.commit()
-                if cursor.rowcount > 0:
-                    self._load_commands()  # Rebuild index
-                    return True
-                return False
+            cursor = self._conn.execute("DELETE FROM commands WHERE id = ?", (command_id,))
+            self._conn.commit()
         except sqlite3.Error:
+            self._conn.rollback()
             return False
+        if cursor.rowcount > 0:
+            self.searcher.delete_command(command_id)
+            return True
+        return False
     
     def _format_command(self, command: str) -> str:
         """Format multi-line commands with proper indentation"""
@@ -129,7 +136,6 @@ class TinyDuckieBot:
     def run(self):
         self._print_header()
         print(Fore.BLUE + "Initializing quackware..." + Style.RESET_ALL)
-        time.sleep(0.5)
         
         print(Fore.GREEN + "\nHacker Command Assistant ready! (Type " + Fore.RED + "/exit" + Fore.GREEN + " to quit)" + Style.RESET_ALL)
         
@@ -142,6 +148,7 @@ class TinyDuckieBot:
                 
                 if user_input.lower() == '/exit':
                     print(Fore.RED + "\nQuacking off... See you soon, hacker duck!\n" + Style.RESET_ALL)
+                    self.close()
                     break
                 
                 if user_input.lower() == '/help':
@@ -171,7 +178,6 @@ class TinyDuckieBot:
                     continue
                 
                 print(Fore.YELLOW + f"\nSearching duckie database for '{user_input}'..." + Style.RESET_ALL)
-                time.sleep(0.3)
                 results = self.search(user_input)
                 
                 if not results: